@@ -2,7 +2,10 @@
 # IMPORTS
 ###############################################################################
 
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+import pickle
 
 from config.exp_config import experiment_params
 from models.market import Market
@@ -11,21 +14,58 @@ from models.market import Market
 # RUN EXPERIMENTS
 ###############################################################################
 
-def run_experiment(exp_key):
+# Experiments share no state, so they can run in threads of one interpreter
+# or in separate processes.
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor
+}
+
+def share_params(params):
+
+    # Pickle the parameters once and publish them in shared memory, so
+    # worker processes read them instead of receiving a copy per task.
+    data = pickle.dumps(params, protocol=5)
+    shm = SharedMemory(create=True, size=len(data))
+    shm.buf[:len(data)] = data
+
+    return shm
+
+def load_params(shm_name):
+
+    # Unpickling stops at the end of the pickle, so any padding the
+    # platform adds to the shared memory block is ignored.
+    shm = SharedMemory(name=shm_name)
+    with shm.buf as buf:
+        params = pickle.loads(buf)
+    shm.close()
+
+    return params
+
+def run_experiment(exp_key, shm_name=None):
 
     print(f"Retrieving Experiment Details: {exp_key}")
-    exp_details = experiment_params[exp_key]
+    params = load_params(shm_name) if shm_name else experiment_params
+    exp_details = params[exp_key]
     exp_name = exp_details['name']
     parameters = exp_details['parameters']
 
     print(f"Starting Experiment: {exp_name} for {parameters['steps']} Steps")
+    # Microdata is written to disk as the experiment runs.
     model = Market(parameters)
-    results = model.run()
+    model.stream(exp_name=exp_name, path='data')
+
+    # The model finishes the file and drops the writer at the end of a
+    # run, so a writer left over means the run failed.
+    try:
+        model.run()
+    finally:
+        if model.writer is not None:
+            model.writer.abort()
 
     print(f"Experiment Complete: {exp_name}")
-    results.save(exp_name=exp_name, path='data')
 
-def main():
+def main(backend='thread'):
 
     print(
         """
@@ -38,21 +78,44 @@ def main():
 
     num_workers = 4
 
-    # Experiments are run independently, but concurrently.
-    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+    # Worker processes read the parameters from shared memory. Threads
+    # read them directly.
+    shm = share_params(experiment_params) if backend == 'process' else None
+    shm_name = shm.name if shm is not None else None
+
+    # The shared memory is released even if waiting on the experiments
+    # fails or is interrupted.
+    try:
+        # Experiments are run independently, but concurrently.
+        with EXECUTORS[backend](max_workers=num_workers) as executor:
 
-        # Submit each experiment to the executor.
-        futures = {executor.submit(run_experiment, exp_key): exp_key for exp_key in experiment_params}
+            # Submit each experiment to the executor.
+            futures = {executor.submit(run_experiment, exp_key, shm_name): exp_key for exp_key in experiment_params}
 
-        # Wait for all experiments to complete and handle exceptions.
-        for future in as_completed(futures):
-            exp_key = futures[future]
+            # Wait for all experiments to complete and handle exceptions.
+            for future in as_completed(futures):
+                exp_key = futures[future]
             
-            # Retrieves the result or raises an exception.
-            try:
-                future.result()
-            except Exception as e:
-                print(f"Experiment {exp_key} generated an exception: {e}")
+                # Retrieves the result or raises an exception.
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Experiment {exp_key} generated an exception: {e}")
+    finally:
+        # All experiments are done with the parameters.
+        if shm is not None:
+            shm.close()
+            shm.unlink()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+
+    parser = ArgumentParser(description='Run the wage discrimination experiments.')
+    parser.add_argument(
+        '--backend',
+        choices=EXECUTORS,
+        default='thread',
+        help='Run experiments in threads (default) or in separate processes.'
+    )
+    args = parser.parse_args()
+
+    main(backend=args.backend)
\ No newline at end of file
@@ -3,6 +3,7 @@
 ###############################################################################
 
 from agentpy import Agent
+import numpy as np
 
 ###############################################################################
 # FIRM AGENT
@@ -21,7 +22,11 @@ class Firm(Agent):
             randomly within a specified range at setup.
         d_class (int): The observed worker characteristic class used in wage determination.
         employees (list): A list of worker agents employed by the firm.
-        size (int): The current size of the firm, in terms of number of employees.
+        emp_prod (ndarray): Productivity of each employee, in the same order as `employees`.
+        emp_hrs (ndarray): Hours worked by each employee, in the same order as `employees`.
+        emp_wage (ndarray): Wage of each employee, in the same order as `employees`.
+        emp_d_class (ndarray): Characteristic class of each employee, in the same order as `employees`.
+        size (int): The current size of the firm, in terms of number of employees, read from the list of employees.
         size_0 (int): The number of employees belonging to characteristic class 0.
         size_1 (int): The number of employees belonging to characteristic class 1.
         price (float): The price of the goods produced by the firm.
@@ -34,9 +39,11 @@ class Firm(Agent):
 
     Methods:
         setup(): Initializes the firm's attributes.
-        set_size(): Updates the firm's size and the distribution of employees by characteristic class.
-        hire(worker): Adds a worker to the firm's list of employees and updates the firm's size.
-        separate(worker): Removes a worker from the firm's list of employees and updates the firm's size.
+        check_size(): Asserts that the firm's size attributes agree with its employees.
+        expand_capacity(): Doubles the capacity of the employee arrays.
+        hire(worker): Adds a worker to the firm's list of employees and updates the firm's class counts.
+        separate(worker): Removes a worker from the firm's list of employees and updates the firm's class counts.
+        update_employee(worker): Refreshes the firm's copy of an employee's productivity and wage.
         produce(): Calculates the firm's total output based on the productivity and hours worked by employees.
         calc_profit(): Calculates the firm's profit by subtracting total costs from total revenue.
         calc_wage(worker): Determines the wage for a given worker based on productivity and characteristic class.
@@ -55,8 +62,18 @@ class Firm(Agent):
         self.d_factor = round(self.model.random.uniform(self.model.p['d_range'][0], self.model.p['d_range'][1]), 2)
         self.d_class = self.model.p['d_class']
 
+        # Employees are stored as parallel arrays (one entry per employee) so
+        # production and costs can be computed as dot products. Only the
+        # first `size` entries are in use; capacity grows by doubling. The
+        # size is read from the list of employees, so hiring and separating
+        # only keep the class counts.
         self.employees = []
-        self.size = 0
+        self._emp_idx = {}
+        self.emp_prod = np.empty(4)
+        self.emp_hrs = np.empty(4)
+        self.emp_wage = np.empty(4)
+        self.emp_d_class = np.empty(4, dtype=np.int8)
+
         self.size_0 = 0
         self.size_1 = 0
 
@@ -69,44 +86,117 @@ class Firm(Agent):
         self.output_0 = 0
         self.output_1 = 0
 
+    ###########################################################################
+    # GETTERS
+    ###########################################################################
+
+    @property
+    def size(self):
+        """
+        The number of employees, read from the list of employees when
+        accessed instead of counted on every hire and separation.
+        """
+
+        return len(self.employees)
+
     ###########################################################################
     # HIRING AND SEPARATIONS
     ###########################################################################
 
-    def set_size(self):
+    def check_size(self):
         """
-        Updates the firm's size attributes based on the current list of employees and their characteristic classes.
+        Asserts that the firm's size attributes agree with the current list of employees and their
+        characteristic classes.
         """
 
-        self.size = len(self.employees)
-        self.size_1 = len([employee for employee in self.employees if employee.d_class == 1])
-        self.size_0 = len([employee for employee in self.employees if employee.d_class == 0])
+        n = len(self.employees)
+
+        assert n == len(self._emp_idx)
+        assert self.size_0 == np.count_nonzero(self.emp_d_class[:n] == 0)
+        assert self.size_1 == np.count_nonzero(self.emp_d_class[:n] == 1)
+
+    def expand_capacity(self):
+        """
+        Doubles the capacity of the employee arrays, preserving the current employees.
+        """
+
+        capacity = 2 * len(self.emp_prod)
+
+        for attr in ('emp_prod', 'emp_hrs', 'emp_wage', 'emp_d_class'):
+            old = getattr(self, attr)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
 
     def hire(self, worker):
         """
-        Adds a worker to the firm's list of employees if not already hired and updates the firm's size.
+        Adds a worker to the firm's list of employees if not already hired and updates the firm's class counts.
 
         Parameters:
             worker (Worker): The worker agent to be hired.
         """
 
-        if worker not in self.employees:
+        if worker.id not in self._emp_idx:
+            n = len(self.employees)
+
+            if n == len(self.emp_prod):
+                self.expand_capacity()
+
             self.employees.append(worker)
+            self._emp_idx[worker.id] = n
+            self.emp_prod[n] = worker.prod
+            self.emp_hrs[n] = worker.hrs
+            self.emp_wage[n] = worker.wage
+            self.emp_d_class[n] = worker.d_class
+
+            self.size_0 += worker.d_class == 0
+            self.size_1 += worker.d_class == 1
 
-        self.set_size()
+        if __debug__:
+            self.check_size()
 
     def separate(self, worker):
         """
-        Removes a worker from the firm's list of employees if currently employed and updates the firm's size.
+        Removes a worker from the firm's list of employees if currently employed and updates the firm's class counts.
 
         Parameters:
             worker (Worker): The worker agent to be separated from the firm.
         """
 
-        if worker in self.employees:
-            self.employees.remove(worker)
-        
-        self.set_size()
+        i = self._emp_idx.pop(worker.id, None)
+
+        if i is not None:
+            last = len(self.employees) - 1
+            moved = self.employees.pop()
+
+            # Move the last employee into the vacated slot, unless the worker
+            # was the last employee.
+            if i != last:
+                self.employees[i] = moved
+                self._emp_idx[moved.id] = i
+                self.emp_prod[i] = self.emp_prod[last]
+                self.emp_hrs[i] = self.emp_hrs[last]
+                self.emp_wage[i] = self.emp_wage[last]
+                self.emp_d_class[i] = self.emp_d_class[last]
+
+            self.size_0 -= worker.d_class == 0
+            self.size_1 -= worker.d_class == 1
+
+        if __debug__:
+            self.check_size()
+
+    def update_employee(self, worker):
+        """
+        Refreshes the firm's copy of an employee's productivity and wage, e.g. after the
+        worker gets an education.
+
+        Parameters:
+            worker (Worker): The employee whose attributes changed.
+        """
+
+        i = self._emp_idx[worker.id]
+        self.emp_prod[i] = worker.prod
+        self.emp_wage[i] = worker.wage
     
     ###########################################################################
     # PRODUCTION
@@ -118,19 +208,27 @@ class Firm(Agent):
         separated by characteristic class.
         """
 
+        n = self.size
+        prod = self.emp_prod[:n]
+        hrs = self.emp_hrs[:n]
+        class_0 = self.emp_d_class[:n] == 0
+        class_1 = self.emp_d_class[:n] == 1
+
         # Q = sum(prod/hr * hr).
-        self.output = sum([employee.prod * employee.hrs for employee in self.employees])
-        self.output_0 = sum([employee.prod * employee.hrs for employee in self.employees if employee.d_class == 0])
-        self.output_1 = sum([employee.prod * employee.hrs for employee in self.employees if employee.d_class == 1])
+        self.output = float(prod @ hrs)
+        self.output_0 = float(prod[class_0] @ hrs[class_0])
+        self.output_1 = float(prod[class_1] @ hrs[class_1])
 
     def calc_profit(self):
         """
         Calculates the firm's total revenue from selling goods, total costs from paying wages, and net profit.
         """
 
+        n = self.size
+
         # Profit = TR - TC = P*Q - sum(wage/hr * hr)
         self.revenue = self.output * self.price
-        self.costs = sum([employee.wage * employee.hrs for employee in self.employees])
+        self.costs = float(self.emp_wage[:n] @ self.emp_hrs[:n])
         self.profit = self.revenue - self.costs
 
     ###########################################################################
@@ -2,11 +2,20 @@
 # IMPORTS
 ###############################################################################
 
-from agentpy import Model, AgentList
+from agentpy import Model, DataDict
 from math import ceil
+from os import makedirs
+import json
+import numpy as np
+import pandas as pd
 
-from .firm import Firm
-from .worker import Worker
+from .writer import AsyncArtifactWriter
+
+# Numba is optional: without it, wage offers are compared with NumPy.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 ###############################################################################
 # MARKET MODEL
@@ -18,6 +27,11 @@ class Market(Model):
     simulates the interactions between workers and firms, including employment,
     wage determination, productivity, and profit calculations.
 
+    The model state is held in arrays with one entry per worker (`worker_*`)
+    or per firm (`firm_*`), and each step updates all selected workers or all
+    firms at once. The rules are the same as those of the Worker and Firm
+    agents, which apply them one agent at a time.
+
     The market model initializes with a specified number of workers and firms,
     where initially, each worker is employed by a unique firm. Throughout the
     simulation, workers can decide to pursue education based on a cost-benefit
@@ -27,8 +41,22 @@ class Market(Model):
     Methods:
         setup(): Initializes the market model, creating workers and firms and setting initial employment relationships.
         step(): Performs a single simulation step, including worker decisions on education and employment, and firm production.
+        education_decision(idx, premium, weighted): Decides on education for a group of workers at once.
+        firm_selection(idx, n): Searches for new employers for a group of workers at once.
+        hire(idx, firm_idx): Adds workers to firms and updates the firms' sizes.
+        separate(idx): Removes workers from their employers and updates the firms' sizes.
+        calc_wage(worker_idx, firm_idx): Determines wage offers for many worker and firm pairs at once.
+        best_offers(idx, firm_idx): Finds each worker's best wage offer among their sampled firms.
+        sample_firms(employer_idx, n): Samples firms for a group of workers, excluding their current employers.
+        calc_avg_d(): Calculates the weighted and unweighted average discrimination factor among active firms.
+        produce(): Calculates each firm's output from its employees' productivity and hours.
+        calc_profit(): Calculates each firm's revenue, costs, and profit.
+        sum_by_employer(values): Sums a per-worker quantity over each firm's employees.
+        stream(exp_name, path, chunk_steps): Streams the microdata to disk while the simulation runs, instead of keeping it in memory.
         update(): Records data from the current state of the simulation for analysis.
-        end(): Finalizes the simulation, potentially performing cleanup or final data recording (currently a placeholder with no implementation).
+        record_history(history, values): Writes the current values of a set of variables into their history arrays.
+        end(): Finalizes the simulation, converting the recorded microdata into data frames, or finishing the streamed file.
+        save(exp_name, path): Writes the recorded microdata and parameters to a single .npz file.
 
     During each simulation step, a subset of active workers is selected to
     possibly pursue education and search for new employment opportunities based
@@ -37,29 +65,70 @@ class Market(Model):
     microdata on both workers and firms for analysis.
     """
 
+    # Set by stream() before the simulation runs.
+    writer = None
+
     def setup(self):
         """
-        Initializes the model by creating the specified number of worker and firm agents.
-        Each worker is initially employed by a unique firm, and wages are determined based on the firm's wage calculation method.
+        Initializes the model by creating the arrays of the specified number of
+        workers and firms. Each worker is initially employed by a unique firm,
+        and wages are determined based on the firms' wage calculation.
         """
 
-        # Initialize agents.
-        self.workers = AgentList(self, self.p['n_workers'], Worker)
-        self.firms = AgentList(self, 2*self.p['n_workers']+1, Firm)
+        # Initialize workers. Workers are held as arrays with one entry per
+        # worker, with the same attributes as the Worker agent, and are
+        # identified by their position. Attributes are drawn for all workers
+        # at once and use the narrowest type that holds them: classes and
+        # hours are small integers, and productivity and wages need no more
+        # than single precision.
+        self.n_workers = self.p['n_workers']
+
+        self.worker_id = np.arange(self.n_workers)
+        self.worker_d_class = self.nprandom.choice([1, 0], size=self.n_workers).astype(np.int8)
+        self.worker_prod = self.nprandom.integers(
+            self.p['prod_range'][0], self.p['prod_range'][1], size=self.n_workers, endpoint=True
+        ).astype(np.float32)
+        self.worker_hrs = np.full(self.n_workers, 8, dtype=np.int8)
+        self.worker_educ = np.zeros(self.n_workers, dtype=bool)
+        self.worker_search = np.zeros(self.n_workers, dtype=bool)
+        self.worker_switch = np.zeros(self.n_workers, dtype=bool)
+
+        # Initialize firms. Firms are held as arrays with one entry per firm,
+        # with the same attributes as the Firm agent, and are identified by
+        # their position.
+        self.n_firms = 2*self.p['n_workers']+1
 
-        # Initialize workers into singleton firms.
-        for i in range(self.p['n_workers']):
+        self.firm_id = np.arange(self.n_firms)
+        self.firm_d_factor = (
+            self.nprandom.uniform(self.p['d_range'][0], self.p['d_range'][1], size=self.n_firms)
+            .round(2)
+            .astype(np.float32)
+        )
+        self.firm_d_class = np.full(self.n_firms, self.p['d_class'], dtype=np.int8)
+
+        self.firm_size = np.zeros(self.n_firms, dtype=np.int32)
+        self.firm_size_0 = np.zeros(self.n_firms, dtype=np.int32)
+        self.firm_size_1 = np.zeros(self.n_firms, dtype=np.int32)
+
+        self.firm_price = np.ones(self.n_firms, dtype=np.float32)
+        self.firm_costs = np.zeros(self.n_firms)
+        self.firm_revenue = np.zeros(self.n_firms)
+        self.firm_profit = np.zeros(self.n_firms)
 
-            # Select worker i and firm i.
-            worker = self.workers[i]
-            firm = self.firms[i]
+        self.firm_output = np.zeros(self.n_firms)
+        self.firm_output_0 = np.zeros(self.n_firms)
+        self.firm_output_1 = np.zeros(self.n_firms)
 
-            # Have the worker i join firm i.
-            worker.update_employer(firm=firm)
-            firm.hire(worker)
+        # Initialize workers into singleton firms: worker i joins firm i at
+        # firm i's wage.
+        idx = np.arange(self.n_workers)
+        self.worker_employer = np.empty(self.n_workers, dtype=np.int32)
+        self.worker_wage = self.calc_wage(worker_idx=idx, firm_idx=idx)
+        self.hire(idx=idx, firm_idx=idx)
 
-            # Set the worker i's wage at firm i.
-            worker.wage = firm.calc_wage(worker=worker)
+        # History arrays for recording microdata.
+        self.worker_history = {}
+        self.firm_history = {}
 
     def step(self):
         """
@@ -76,34 +145,297 @@ class Market(Model):
         """
 
         # Restart counters.
-        self.workers.search = False
-        self.workers.switch = False
-
-        # Select active workers at random.
-        workers_sel = (
-            self.workers
-            .random(
-                n=ceil(self.model.p['n_workers']*self.model.p['active'])
-            )
+        self.worker_search[:] = False
+        self.worker_switch[:] = False
+
+        # Select active workers at random, by position in the worker arrays.
+        idx = self.nprandom.choice(
+            self.n_workers,
+            size=ceil(self.model.p['n_workers']*self.model.p['active']),
+            replace=False
         )
 
+        # Calculate the average discrimination factor once for all workers
+        # deciding on education this step. Firm sizes do not change until
+        # the firm selection below.
+        self.calc_avg_d()
+
         # Decide whether to get an education.
-        for worker in workers_sel:
-            if worker.educ == 0:
-                worker.education_decision(
-                    premium=self.model.p['premium'],
-                    weighted=self.model.p['weighted']
-                )
+        self.education_decision(
+            idx=idx,
+            premium=self.model.p['premium'],
+            weighted=self.model.p['weighted']
+        )
         
         # Search for new firm.
-        workers_sel.firm_selection(n=self.model.p['sample'])
-
-        # All workers update their firm size.
-        self.workers.employer_size = self.workers.employer.size
+        self.firm_selection(idx=idx, n=self.model.p['sample'])
 
         # Firms produce output and calculate profits.
-        self.firms.produce()
-        self.firms.calc_profit()
+        self.produce()
+        self.calc_profit()
+
+    def education_decision(self, idx, premium, weighted):
+        """
+        Makes the education decision for a group of workers at once. Applies
+        the same cost-benefit analysis as Worker.education_decision to the
+        workers' arrays, then grants an education to the workers who choose it.
+
+        Parameters:
+            idx (ndarray): The positions of the deciding workers in the worker arrays.
+            premium (float): The productivity increase percentage from obtaining education.
+            weighted (bool): If True, uses a weighted average of discrimination factors in the cost-benefit analysis.
+        """
+
+        # Only workers without an education decide.
+        idx = idx[~self.worker_educ[idx]]
+        prod = self.worker_prod[idx]
+
+        avg_prod = (self.p['prod_range'][1] + self.p['prod_range'][0]) / 2
+        d_avg = self.avg_d_weighted if weighted else self.avg_d_unweighted
+
+        # Cost-benefit, as in Worker.education_decision.
+        cost = (avg_prod**2 * premium) / prod
+        benefit = prod * premium
+        benefit = np.where(self.worker_d_class[idx] == 1, benefit * (1 - d_avg), benefit)
+
+        # Solve indifference with random choice.
+        educ = benefit > cost
+        tie = benefit == cost
+        educ[tie] = self.nprandom.random(tie.sum()) < 0.5
+
+        # Grant education.
+        idx = idx[educ]
+        self.worker_prod[idx] *= 1 + premium
+        self.worker_educ[idx] = True
+
+        # Employers immediately adjust wages to match gains from education.
+        self.worker_wage[idx] = self.calc_wage(worker_idx=idx, firm_idx=self.worker_employer[idx])
+
+    def firm_selection(self, idx, n):
+        """
+        Searches for new employers for a group of workers at once. Each worker
+        samples `n` firms and switches to the best offer if it pays more than
+        the current wage, as in Worker.firm_selection.
+
+        Parameters:
+            idx (ndarray): The positions of the searching workers in the worker arrays.
+            n (int): The number of potential new employers each worker considers.
+        """
+
+        # Best offer from the sampled firms, per worker.
+        firm_idx = self.sample_firms(employer_idx=self.worker_employer[idx], n=n)
+        best_firm, best_wage = self.best_offers(idx=idx, firm_idx=firm_idx)
+
+        self.worker_search[idx] = True
+
+        # Switch employers where the best offer is higher than the current wage.
+        switch = best_wage > self.worker_wage[idx]
+        idx, best_firm, best_wage = idx[switch], best_firm[switch], best_wage[switch]
+
+        self.worker_wage[idx] = best_wage
+        self.separate(idx=idx)
+        self.hire(idx=idx, firm_idx=best_firm)
+        self.worker_switch[idx] = True
+
+    def hire(self, idx, firm_idx):
+        """
+        Adds workers to firms' employees and updates the firms' sizes.
+
+        Parameters:
+            idx (ndarray): The positions of the workers in the worker arrays.
+            firm_idx (ndarray): The positions of the hiring firms in the firm arrays, one per worker.
+        """
+
+        d_class = self.worker_d_class[idx]
+
+        self.worker_employer[idx] = firm_idx
+        np.add.at(self.firm_size, firm_idx, 1)
+        np.add.at(self.firm_size_0, firm_idx[d_class == 0], 1)
+        np.add.at(self.firm_size_1, firm_idx[d_class == 1], 1)
+
+    def separate(self, idx):
+        """
+        Removes workers from their employers' employees and updates the firms' sizes.
+
+        Parameters:
+            idx (ndarray): The positions of the workers in the worker arrays.
+        """
+
+        d_class = self.worker_d_class[idx]
+        firm_idx = self.worker_employer[idx]
+
+        np.subtract.at(self.firm_size, firm_idx, 1)
+        np.subtract.at(self.firm_size_0, firm_idx[d_class == 0], 1)
+        np.subtract.at(self.firm_size_1, firm_idx[d_class == 1], 1)
+
+    def calc_wage(self, worker_idx, firm_idx):
+        """
+        Determines the wages firms offer workers, as in Firm.calc_wage, for
+        many worker and firm pairs at once.
+
+        Parameters:
+            worker_idx (ndarray): The positions of the workers in the worker arrays.
+            firm_idx (ndarray): The positions of the firms in the firm arrays, broadcastable against `worker_idx`.
+
+        Returns:
+            ndarray: The calculated wage for each worker and firm pair.
+        """
+
+        # Set wage equal to MPL.
+        wage = self.firm_price[firm_idx] * self.worker_prod[worker_idx]
+
+        # Apply wage factor based on observed worker characteristic.
+        d_factor = np.where(
+            self.firm_d_class[firm_idx] == self.worker_d_class[worker_idx],
+            self.firm_d_factor[firm_idx],
+            0.0
+        )
+
+        return wage * (1 - d_factor)
+
+    def best_offers(self, idx, firm_idx):
+        """
+        Finds each worker's best wage offer among their sampled firms. Offers
+        are compared in a single compiled pass when Numba is installed, and
+        with NumPy otherwise.
+
+        Parameters:
+            idx (ndarray): The positions of the workers in the worker arrays.
+            firm_idx (ndarray): The positions of the sampled firms in the firm arrays, one row per worker.
+
+        Returns:
+            tuple: The position of the best firm and its wage offer, one entry per worker.
+        """
+
+        if njit is not None:
+            return best_offers_kernel(
+                self.worker_prod[idx], self.worker_d_class[idx], firm_idx,
+                self.firm_price, self.firm_d_factor, self.firm_d_class
+            )
+
+        wages = self.calc_wage(worker_idx=idx[:, None], firm_idx=firm_idx)
+        rows = np.arange(len(idx))
+        best = wages.argmax(axis=1)
+
+        return firm_idx[rows, best], wages[rows, best]
+
+    def sample_firms(self, employer_idx, n):
+        """
+        Samples `n` distinct firms for each of a group of workers, excluding
+        each worker's current employer.
+
+        Parameters:
+            employer_idx (array-like): The positions of the workers' current employers in the firm arrays.
+            n (int): The number of firms to sample per worker.
+
+        Returns:
+            ndarray: The positions of the sampled firms, one row per worker.
+
+        Raises:
+            ValueError: If `n` is larger than the number of firms other than the employer.
+        """
+
+        if n > self.n_firms - 1:
+            raise ValueError(f'Cannot sample {n} firms from the {self.n_firms - 1} firms other than the employer.')
+
+        employer_idx = np.asarray(employer_idx)
+
+        # Draw from all positions but one. Small samples redraw any row that
+        # contains the same firm twice, which most rows pass on the first
+        # draw. Large samples take the positions of the `n` smallest of one
+        # uniform draw per firm, which are distinct by construction.
+        if n * n <= self.n_firms - 1:
+            idx = np.empty((len(employer_idx), n), dtype=int)
+            redraw = np.ones(len(employer_idx), dtype=bool)
+            while redraw.any():
+                idx[redraw] = self.nprandom.integers(self.n_firms - 1, size=(redraw.sum(), n))
+                idx_sorted = np.sort(idx, axis=1)
+                redraw = (idx_sorted[:, 1:] == idx_sorted[:, :-1]).any(axis=1)
+        else:
+            keys = self.nprandom.random((len(employer_idx), self.n_firms - 1))
+            idx = np.argpartition(keys, n - 1, axis=1)[:, :n]
+
+        # Skip over the employer's position.
+        idx += idx >= employer_idx[:, None]
+
+        return idx
+
+    def calc_avg_d(self):
+        """
+        Calculates the average discrimination factor across active firms, both
+        unweighted and weighted by firm size, and stores them as
+        `avg_d_unweighted` and `avg_d_weighted`.
+        """
+
+        # Find active firms.
+        active = self.firm_size > 0
+        size = self.firm_size[active]
+        d_factor = self.firm_d_factor[active]
+
+        self.avg_d_unweighted = float(d_factor.mean(dtype=float))
+        self.avg_d_weighted = float(np.sum(d_factor * (size / size.sum())))
+
+    def produce(self):
+        """
+        Calculates the total output of each firm based on the productivity and
+        hours worked by its employees, separated by characteristic class.
+        """
+
+        # Q = sum(prod/hr * hr).
+        output = self.worker_prod * self.worker_hrs
+        class_0 = self.worker_d_class == 0
+        class_1 = self.worker_d_class == 1
+
+        self.firm_output = self.sum_by_employer(output)
+        self.firm_output_0 = self.sum_by_employer(output * class_0)
+        self.firm_output_1 = self.sum_by_employer(output * class_1)
+
+    def calc_profit(self):
+        """
+        Calculates each firm's total revenue from selling goods, total costs
+        from paying wages, and net profit.
+        """
+
+        # Profit = TR - TC = P*Q - sum(wage/hr * hr)
+        self.firm_revenue = self.firm_output * self.firm_price
+        self.firm_costs = self.sum_by_employer(self.worker_wage * self.worker_hrs)
+        self.firm_profit = self.firm_revenue - self.firm_costs
+
+    def sum_by_employer(self, values):
+        """
+        Sums a per-worker quantity over each firm's employees, in a single
+        pass over the workers.
+
+        Parameters:
+            values (ndarray): The quantity, one entry per worker.
+
+        Returns:
+            ndarray: The sum for each firm, zero for firms without employees.
+        """
+
+        return np.bincount(self.worker_employer, weights=values, minlength=self.n_firms)
+
+    def stream(self, exp_name, path='data', chunk_steps=100):
+        """
+        Streams the microdata to `{path}/{exp_name}.npz` while the simulation
+        runs, instead of keeping it in memory for `end` and `save`. Steps are
+        written in chunks of `chunk_steps` from a background thread, and the
+        file is finished by `end`. It reads like a file written by `save`.
+        Must be called before the simulation runs.
+
+        Parameters:
+            exp_name (str): The name of the experiment.
+            path (str): The target directory. Defaults to 'data'.
+            chunk_steps (int): The number of steps written to disk at a time. Defaults to 100.
+        """
+
+        makedirs(path, exist_ok=True)
+
+        self.writer = AsyncArtifactWriter(
+            f'{path}/{exp_name}.npz',
+            chunk_steps=chunk_steps,
+            static={'parameters': json.dumps(dict(self.p))}
+        )
 
     def update(self):
         """
@@ -112,25 +444,202 @@ class Market(Model):
         productivity, wages, firm size, output, and profit.
         """
 
-        # Record microdata.
-        self.workers.record(
-            [
-                'd_class', 'prod', 'hrs', 'employer', 'employer_id',
-                'employer_size', 'wage', 'educ', 'search', 'switch'
-            ]
-        )
+        worker_values = {
+            'd_class': self.worker_d_class,
+            'prod': self.worker_prod,
+            'hrs': self.worker_hrs,
+            'employer_id': self.worker_employer,
+            'employer_size': self.firm_size[self.worker_employer],
+            'wage': self.worker_wage,
+            'educ': self.worker_educ,
+            'search': self.worker_search,
+            'switch': self.worker_switch
+        }
+
+        firm_values = {
+            'd_factor': self.firm_d_factor,
+            'size': self.firm_size,
+            'size_0': self.firm_size_0,
+            'size_1': self.firm_size_1,
+            'output': self.firm_output,
+            'output_0': self.firm_output_0,
+            'output_1': self.firm_output_1,
+            'costs': self.firm_costs,
+            'revenue': self.firm_revenue,
+            'profit': self.firm_profit
+        }
+
+        # Record microdata, to disk if streaming.
+        if self.writer is not None:
+            self.writer.enqueue(self.t, {
+                **{f'Worker.{var}': value for var, value in worker_values.items()},
+                **{f'Firm.{var}': value for var, value in firm_values.items()}
+            })
+        else:
+            self.record_history(self.worker_history, worker_values)
+            self.record_history(self.firm_history, firm_values)
+
+    def record_history(self, history, values):
+        """
+        Writes the current values of a set of variables into row `t` of their
+        history arrays. The history arrays are allocated on the first call, with
+        one row per simulation step, and double in length if the simulation
+        runs longer. Runs without a set number of steps start from 64 rows.
+
+        Parameters:
+            history (dict): The history arrays, by variable name.
+            values (dict): The current values, by variable name. Each value is an array with one entry per agent.
+        """
+
+        for var, value in values.items():
+            if var not in history:
+                rows = int(self._steps) + 1 if np.isfinite(self._steps) else 64
+                history[var] = np.empty((rows, len(value)), dtype=value.dtype)
+
+            elif self.t >= len(history[var]):
+                old = history[var]
+                history[var] = np.empty((max(2 * len(old), self.t + 1), len(value)), dtype=old.dtype)
+                history[var][:len(old)] = old
+
+            history[var][self.t] = value
 
-        self.firms.record(
-            [
-                'd_factor', 'size', 'size_0', 'size_1', 'output',
-                'output_0', 'output_1', 'costs', 'revenue', 'profit', 
-            ]
-        )
-            
     def end(self):
         """
-        Finalizes the simulation. This method serves as a placeholder and can
-        be implemented to perform cleanup or final data recording operations at
-        the end of the simulation.
+        Finalizes the simulation by converting the recorded microdata into
+        data frames of workers and firms, indexed by agent id and time step,
+        in the model's output. When streaming, finishes the file on disk
+        instead; the microdata can be read back with `load_microdata`.
+        """
+
+        if self.writer is not None:
+            self.writer.static.update({'Worker.obj_id': self.worker_id, 'Firm.obj_id': self.firm_id})
+            self.writer.close()
+            self.writer = None
+            return
+
+        steps = self.t + 1
+
+        self.output['variables'] = DataDict(
+            Worker=history_frame(self.worker_history, self.worker_id, steps),
+            Firm=history_frame(self.firm_history, self.firm_id, steps)
+        )
+
+    def save(self, exp_name, path='data'):
+        """
+        Writes the recorded microdata and the model parameters to
+        `{path}/{exp_name}.npz` in a single compressed write. The file can be
+        read back with `load_microdata`.
+
+        Parameters:
+            exp_name (str): The name of the experiment.
+            path (str): The target directory. Defaults to 'data'.
         """
-        pass
\ No newline at end of file
+
+        steps = self.t + 1
+        makedirs(path, exist_ok=True)
+
+        np.savez_compressed(
+            f'{path}/{exp_name}.npz',
+            parameters=json.dumps(dict(self.p)),
+            **{'Worker.obj_id': self.worker_id, 'Firm.obj_id': self.firm_id},
+            **{f'Worker.{var}': values[:steps] for var, values in self.worker_history.items()},
+            **{f'Firm.{var}': values[:steps] for var, values in self.firm_history.items()}
+        )
+
+###############################################################################
+# KERNELS
+###############################################################################
+
+def best_offers_kernel(prod, d_class, firm_idx, firm_price, firm_d_factor, firm_d_class):
+    """
+    Finds each worker's best wage offer among their sampled firms, applying
+    Firm.calc_wage to one worker and firm pair at a time. Compiled with Numba,
+    when installed, to compare offers without building the matrix of offers.
+    It starts no threads of its own, so experiments running in threads can
+    call it at the same time. Ties go to the first sampled firm, as with
+    argmax, and offers are kept in single precision, as in Market.calc_wage.
+
+    Parameters:
+        prod (ndarray): The workers' productivity.
+        d_class (ndarray): The workers' discrimination class.
+        firm_idx (ndarray): The positions of the sampled firms in the firm arrays, one row per worker.
+        firm_price (ndarray): The firms' output price.
+        firm_d_factor (ndarray): The firms' discrimination factor.
+        firm_d_class (ndarray): The class each firm discriminates against.
+
+    Returns:
+        tuple: The position of the best firm and its wage offer, one entry per worker.
+    """
+
+    n_workers, n = firm_idx.shape
+    best_firm = np.empty(n_workers, dtype=firm_idx.dtype)
+    best_wage = np.empty(n_workers, dtype=prod.dtype)
+
+    for i in range(n_workers):
+        for j in range(n):
+            f = firm_idx[i, j]
+            wage = firm_price[f] * prod[i]
+            if firm_d_class[f] == d_class[i]:
+                wage = wage * (np.float32(1) - firm_d_factor[f])
+            if j == 0 or wage > best_wage[i]:
+                best_firm[i] = f
+                best_wage[i] = wage
+
+    return best_firm, best_wage
+
+if njit is not None:
+    best_offers_kernel = njit(best_offers_kernel)
+
+###############################################################################
+# MICRODATA
+###############################################################################
+
+def history_frame(history, obj_id, steps):
+    """
+    Converts history arrays into a data frame with one row per agent and time
+    step.
+
+    Parameters:
+        history (dict): The history arrays, by variable name, with one row per time step and one column per agent.
+        obj_id (ndarray): The agent ids, in the order of the history arrays' columns.
+        steps (int): The number of recorded time steps.
+
+    Returns:
+        DataFrame: The recorded variables, indexed by agent id and time step.
+    """
+
+    frame = pd.DataFrame({
+        'obj_id': np.repeat(obj_id, steps),
+        't': np.tile(np.arange(steps), len(obj_id)),
+        **{var: values[:steps].T.ravel() for var, values in history.items()}
+    })
+
+    return frame.set_index(['obj_id', 't'])
+
+def load_microdata(file):
+    """
+    Reads microdata written by Market.save.
+
+    Parameters:
+        file (str): The path to the .npz file.
+
+    Returns:
+        DataDict: The model parameters under `parameters`, and data frames of
+        workers and firms, indexed by agent id and time step, under
+        `variables.Worker` and `variables.Firm`.
+    """
+
+    data = DataDict(variables=DataDict())
+
+    with np.load(file) as npz:
+        data['parameters'] = json.loads(str(npz['parameters']))
+
+        for obj_type in ['Worker', 'Firm']:
+            history = {
+                key.split('.', 1)[1]: npz[key] for key in npz.files
+                if key.startswith(f'{obj_type}.') and key != f'{obj_type}.obj_id'
+            }
+            steps = len(next(iter(history.values())))
+            data['variables'][obj_type] = history_frame(history, npz[f'{obj_type}.obj_id'], steps)
+
+    return data
@@ -3,7 +3,6 @@
 ###############################################################################
 
 from agentpy import Agent
-from numpy import mean
 
 ###############################################################################
 # WORKER AGENT
@@ -30,7 +29,7 @@ class Worker(Agent):
         wage (float): The wage of the worker, initially 0 and updated based on employment status and decisions.
         employer (Firm or None): The current employer of the worker, if any.
         employer_id (int or None): The unique ID of the worker's current employer, if any.
-        employer_size (int or None): The size of the worker's current employer, if any.
+        employer_size (int or None): The size of the worker's current employer, if any, read from the employer when accessed.
         search (bool): Indicates whether the worker is actively searching for a new employer.
         switch (bool): Indicates whether the worker has switched employers in the current model step.
 
@@ -38,12 +37,12 @@ class Worker(Agent):
         setup(): Initializes worker attributes based on model parameters.
         update_employer(firm): Updates the worker's employment status and employer-related attributes.
         switch_employer(firm): Switches the worker's employment to a new firm, handling separation and hiring.
-        calc_avg_d(weighted=False): Calculates the average discrimination factor among active firms.
+        calc_avg_d(weighted=False): Returns the average discrimination factor among active firms.
         get_education(premium): Grants the worker education, increasing productivity and potentially wages.
         education_decision(premium, weighted): Decides whether to get education based on a cost-benefit analysis.
-        select_firms(n): Selects a sample of firms that are not the worker's current employer.
-        rank_firms(n): Ranks potential employers based on the wage offers for the worker.
-        firm_selection(n): Decides whether to switch employers based on wage offers from ranked firms.
+        select_firms(firms, n): Selects a sample of firms that are not the worker's current employer.
+        rank_firms(firms, n): Ranks potential employers based on the wage offers for the worker.
+        firm_selection(firms, n): Decides whether to switch employers based on wage offers from ranked firms.
     """
 
     ###########################################################################
@@ -66,10 +65,23 @@ class Worker(Agent):
         self.employer = None
         self.employer_id = None
 
-        self.employer_size = None
         self.search = False
         self.switch = False
 
+    ###########################################################################
+    # GETTERS
+    ###########################################################################
+
+    @property
+    def employer_size(self):
+        """
+        The size of the worker's current employer, or None if unemployed. Read
+        from the employer, so it is current whenever the firm hires or
+        separates other workers.
+        """
+
+        return self.employer.size if self.employer else None
+
     ###########################################################################
     # SETTERS
     ###########################################################################
@@ -86,11 +98,9 @@ class Worker(Agent):
         if firm:
             self.employer = firm
             self.employer_id = firm.id
-            self.employer_size = firm.size
         else:
             self.employer = None
             self.employer_id = None
-            self.employer_size  = None
 
     def switch_employer(self, firm):
         """
@@ -117,32 +127,22 @@ class Worker(Agent):
 
     def calc_avg_d(self, weighted=False):
         """
-        Calculates the average discrimination factor across active firms,
-        optionally weighted by firm size.
+        Returns the average discrimination factor across active firms,
+        optionally weighted by firm size. The market calculates both averages
+        once per step (see Market.calc_avg_d).
 
         Parameters:
-            weighted (bool): If True, calculates a weighted average based on
+            weighted (bool): If True, returns the weighted average based on
             firm size. Defaults to False.
 
         Returns:
             float: The average discrimination factor.
         """
 
-        # Find active firms.
-        firms = (
-            self.model.firms
-            .select(self.model.firms.size > 0)
-        )
-
-        # Calculate average discrimination factor. If weighted, then calculate
-        # weighted average based on firm size.
         if weighted:
-            size = sum(firm.size for firm in firms)
-            avg = sum(firm.d_factor * (firm.size / size) for firm in firms)
-        else:
-            avg = mean([firm.d_factor for firm in firms])
-        
-        return avg
+            return self.model.avg_d_weighted
+
+        return self.model.avg_d_unweighted
 
     def get_education(self, premium):
         """
@@ -162,6 +162,7 @@ class Worker(Agent):
         # from education.
         if self.employer:
             self.wage = self.employer.calc_wage(worker=self)
+            self.employer.update_employee(worker=self)
 
     def education_decision(self, premium, weighted):
         """
@@ -199,12 +200,13 @@ class Worker(Agent):
     # FIRM SELECTION
     ###########################################################################
     
-    def select_firms(self, n):
+    def select_firms(self, firms, n):
         """
         Selects a random sample of firms, excluding the worker's current employer,
         for potential employment.
 
         Parameters:
+            firms (list): The firm agents in the market.
             n (int): The number of firms to sample.
 
         Returns:
@@ -212,20 +214,16 @@ class Worker(Agent):
         """
 
         # Select a random sample of firms that are not the agent's firm.
-        firms = (
-            self.model.firms
-            .select(self.model.firms.id != self.employer_id)
-            .random(n=n, replace=False)
-            .to_list()
-        )
+        firms = self.model.random.sample([firm for firm in firms if firm is not self.employer], k=n)
     
         return firms
 
-    def rank_firms(self, n):
+    def rank_firms(self, firms, n):
         """
         Ranks potential employers based on wage offers and selects the best option.
 
         Parameters:
+            firms (list): The firm agents in the market.
             n (int): The number of firms to consider in the ranking process.
 
         Returns:
@@ -233,34 +231,35 @@ class Worker(Agent):
         """
 
         # Find potential employers.
-        firms = self.select_firms(n=n)
+        firms = self.select_firms(firms=firms, n=n)
 
         # Get a wage from each employer.
         wages = [
             firm.calc_wage(worker=self) for firm in firms
         ]
     
-        # Get the index value of the firm with the highest growth rate.
+        # Get the index value of the firm with the highest wage offer.
         max_idx = wages.index(max(wages))
   
         return firms[max_idx], wages[max_idx]
 
-    def firm_selection(self, n):
+    def firm_selection(self, firms, n):
         """
         Decides whether to switch employers based on the comparison of current
         wage and potential new wage offers.
 
         Parameters:
+            firms (list): The firm agents in the market.
             n (int): The number of potential new employers to consider.
         """
 
         # Search for firms, find best option.
         self.search = True
-        firm, wage = self.rank_firms(n=n)
+        firm, wage = self.rank_firms(firms=firms, n=n)
 
         # If best option offers higher wage than current wage, then
         # switch employers.
         if wage > self.wage:
-            self.switched = True
+            self.switch = True
             self.wage = wage
             self.switch_employer(firm=firm)
\ No newline at end of file
@@ -0,0 +1,202 @@
+###############################################################################
+# IMPORTS
+###############################################################################
+
+from os import remove
+from os.path import exists
+from queue import Queue
+from threading import Thread
+from zipfile import ZipFile, ZIP_DEFLATED
+import numpy as np
+
+###############################################################################
+# ASYNC ARTIFACT WRITER
+###############################################################################
+
+class AsyncArtifactWriter:
+    """
+    Streams per-step microdata to disk from a background thread, so a
+    simulation does not hold its full history in memory or wait on disk
+    writes.
+
+    Each step's arrays are copied into an in-memory chunk of `chunk_steps`
+    rows. Full chunks are handed to a writer thread, which saves each one to
+    its own file. On close, the chunks are merged into a single compressed
+    .npz file, one variable at a time, with one row per step.
+
+    Attributes:
+        file (str): The path of the merged .npz file.
+        chunk_steps (int): The number of steps held in each chunk.
+        static (dict): Arrays written once to the merged file, by name.
+        chunk_files (list): The paths of the chunk files written so far.
+
+    Methods:
+        enqueue(t, arrays): Copies the arrays of step `t` into the current chunk.
+        flush(): Hands the current chunk to the writer thread.
+        close(): Writes the remaining steps, waits for the writer thread, and merges the chunks.
+        merge(): Concatenates the chunk files into the merged file and removes them.
+        abort(): Stops the writer thread and removes the chunk files, without writing the merged file.
+    """
+
+    def __init__(self, file, chunk_steps=100, static=None):
+        """
+        Starts the writer thread.
+
+        Parameters:
+            file (str): The path of the merged .npz file.
+            chunk_steps (int): The number of steps held in each chunk. Defaults to 100.
+            static (dict or None): Arrays written once to the merged file, by name.
+        """
+
+        self.file = file
+        self.chunk_steps = chunk_steps
+        self.static = static or {}
+        self.chunk_files = []
+
+        self.chunk = None
+        self.chunk_t = None
+        self.rows = 0
+        self.error = None
+
+        # At most one chunk waits while another is written, which bounds the
+        # memory held by the writer.
+        self.queue = Queue(maxsize=1)
+        self.thread = Thread(target=self.write_chunks, daemon=True)
+        self.thread.start()
+
+    def enqueue(self, t, arrays):
+        """
+        Copies the arrays of step `t` into the current chunk, handing it to
+        the writer thread when full. Steps must be enqueued in order. The
+        arrays are copied, so the caller may keep modifying them.
+
+        Parameters:
+            t (int): The time step.
+            arrays (dict): The step's values, by variable name. Each value is an array with one entry per agent.
+        """
+
+        if self.error is not None:
+            raise self.error
+
+        if self.chunk is None:
+            self.chunk = {
+                var: np.empty((self.chunk_steps, len(value)), dtype=value.dtype)
+                for var, value in arrays.items()
+            }
+            self.chunk_t = t
+
+        for var, value in arrays.items():
+            self.chunk[var][self.rows] = value
+
+        self.rows += 1
+
+        if self.rows == self.chunk_steps:
+            self.flush()
+
+    def flush(self):
+        """
+        Hands the current chunk, trimmed to the rows written, to the writer
+        thread.
+        """
+
+        if self.chunk is None:
+            return
+
+        file = f'{self.file}.{self.chunk_t}.chunk.npz'
+        self.chunk_files.append(file)
+        self.queue.put((file, {var: values[:self.rows] for var, values in self.chunk.items()}))
+
+        self.chunk = None
+        self.rows = 0
+
+    def write_chunks(self):
+        """
+        Writes chunks from the queue to their files until it receives None.
+        Runs in the writer thread; the first error is kept and raised in the
+        simulation thread.
+        """
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            file, chunk = item
+            if self.error is None:
+                try:
+                    np.savez(file, **chunk)
+                except Exception as e:
+                    self.error = e
+
+    def close(self):
+        """
+        Writes the remaining steps, waits for the writer thread to finish,
+        and merges the chunks into the merged file.
+        """
+
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+        self.merge()
+
+    def merge(self):
+        """
+        Concatenates the chunk files into the merged file, holding a single
+        variable in memory at a time, and removes the chunk files. The merged
+        file reads like one written with `np.savez_compressed`.
+        """
+
+        with ZipFile(self.file, 'w', compression=ZIP_DEFLATED) as npz:
+            for var, value in self.static.items():
+                write_npy(npz, var, np.asarray(value))
+
+            if self.chunk_files:
+                with np.load(self.chunk_files[0]) as chunk:
+                    variables = chunk.files
+
+                for var in variables:
+                    values = []
+                    for file in self.chunk_files:
+                        with np.load(file) as chunk:
+                            values.append(chunk[var])
+                    write_npy(npz, var, np.concatenate(values))
+
+        for file in self.chunk_files:
+            remove(file)
+
+        self.chunk_files = []
+
+    def abort(self):
+        """
+        Discards the steps not yet written, stops the writer thread, and
+        removes the chunk files, without writing the merged file. Used when
+        the simulation fails before it can be closed.
+        """
+
+        self.chunk = None
+        self.rows = 0
+        self.queue.put(None)
+        self.thread.join()
+
+        for file in self.chunk_files:
+            if exists(file):
+                remove(file)
+
+        self.chunk_files = []
+
+def write_npy(npz, var, value):
+    """
+    Writes an array to an open .npz archive in the .npy format.
+
+    Parameters:
+        npz (ZipFile): The archive, open for writing.
+        var (str): The variable name.
+        value (ndarray): The array.
+    """
+
+    with npz.open(f'{var}.npy', 'w', force_zip64=True) as file:
+        np.lib.format.write_array(file, value, allow_pickle=False)
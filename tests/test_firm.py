@@ -1,4 +1,5 @@
 import unittest
+from itertools import count
 from unittest.mock import MagicMock
 from src.models.firm import Firm
 from src.models.worker import Worker
@@ -13,6 +14,9 @@ class TestFirm(unittest.TestCase):
             'd_class': 1,  # Discrimination class
             'prod_range': (10, 20)  # Range for productivity
         }
+        self.mock_model._new_id.side_effect = count(1)  # Unique agent ids
+        self.mock_model.random.choice.return_value = 1  # Worker discrimination class
+        self.mock_model.random.randint.return_value = 15  # Worker productivity
 
         # Directly assigning mock values to ensure they are not treated as MagicMock objects
         self.firm = Firm(self.mock_model)
@@ -33,6 +37,9 @@ class TestFirm(unittest.TestCase):
         self.firm.hire(worker)
         self.assertIn(worker, self.firm.employees)
         self.assertEqual(len(self.firm.employees), 1)
+        self.assertEqual(self.firm.size, 1)
+        self.assertEqual(self.firm.size_1, 1)
+        self.assertEqual(self.firm.size_0, 0)
 
     def test_separate(self):
         # Test separating a worker
@@ -41,6 +48,53 @@ class TestFirm(unittest.TestCase):
         self.firm.separate(worker)
         self.assertNotIn(worker, self.firm.employees)
         self.assertEqual(len(self.firm.employees), 0)
+        self.assertEqual(self.firm.size, 0)
+        self.assertEqual(self.firm.size_1, 0)
+
+    def test_separate_non_employee(self):
+        # Test that separating a worker who is not employed leaves the size unchanged
+        worker = Worker(self.mock_model)
+        self.firm.hire(worker)
+        self.firm.separate(Worker(self.mock_model))
+        self.assertEqual(self.firm.size, 1)
+        self.assertEqual(self.firm.size_1, 1)
+
+    def test_separate_keeps_remaining_employees(self):
+        # Test that separating one worker leaves the others' data in place
+        worker_1 = Worker(self.mock_model)
+        worker_1.prod, worker_1.d_class = 10, 0
+        worker_2 = Worker(self.mock_model)
+        worker_2.prod, worker_2.d_class = 20, 1
+        self.firm.hire(worker_1)
+        self.firm.hire(worker_2)
+        self.firm.separate(worker_1)
+        self.firm.produce()
+        self.assertEqual(self.firm.employees, [worker_2])
+        self.assertEqual(self.firm.output, 20 * 8)
+        self.assertEqual(self.firm.output_0, 0)
+        self.assertEqual(self.firm.output_1, 20 * 8)
+
+    def test_hire_twice(self):
+        # Test that hiring an existing employee does not add them again
+        worker = Worker(self.mock_model)
+        self.firm.hire(worker)
+        self.firm.hire(worker)
+        self.assertEqual(self.firm.employees, [worker])
+        self.assertEqual(self.firm.size, 1)
+
+    def test_update_employee(self):
+        # Test that the firm picks up an employee's new productivity and wage
+        worker = Worker(self.mock_model)
+        worker.prod = 15
+        worker.wage = 10
+        self.firm.hire(worker)
+        worker.prod = 18
+        worker.wage = 12
+        self.firm.update_employee(worker)
+        self.firm.produce()
+        self.firm.calc_profit()
+        self.assertEqual(self.firm.output, 18 * 8)
+        self.assertEqual(self.firm.costs, 12 * 8)
 
     def test_produce(self):
         # Test production logic
@@ -77,6 +131,3 @@ class TestFirm(unittest.TestCase):
         wage = self.firm.calc_wage(worker)
         expected_wage = self.firm.price * worker.prod * (1 - self.firm.d_factor)
         self.assertAlmostEqual(wage, expected_wage, places=2)
-
-if __name__ == '__main__':
-    unittest.main()
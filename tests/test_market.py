@@ -0,0 +1,252 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+import numpy as np
+from pandas.testing import assert_frame_equal
+from src.models.market import Market, best_offers_kernel, load_microdata
+
+class TestMarket(unittest.TestCase):
+
+    def setUp(self):
+        # Small market, set up but not yet stepped
+        self.model = Market({
+            'seed': 1,
+            'steps': 5,
+            'n_workers': 10,
+            'prod_range': [1, 20],
+            'd_range': [0, 1],
+            'premium': 0.20,
+            'weighted': True,
+            'd_class': 1,
+            'active': 0.5,
+            'sample': 3
+        })
+        self.model.sim_setup()
+
+    def assertFirmSizes(self):
+        # Firm sizes must match the workers' employers
+        employer = self.model.worker_employer
+        d_class = self.model.worker_d_class
+        n_firms = self.model.n_firms
+        np.testing.assert_array_equal(self.model.firm_size, np.bincount(employer, minlength=n_firms))
+        np.testing.assert_array_equal(self.model.firm_size_0, np.bincount(employer[d_class == 0], minlength=n_firms))
+        np.testing.assert_array_equal(self.model.firm_size_1, np.bincount(employer[d_class == 1], minlength=n_firms))
+
+    def test_initialization(self):
+        # Test each worker starts at their own firm, at that firm's wage
+        n_workers = self.model.n_workers
+        self.assertEqual(self.model.n_firms, 2 * n_workers + 1)
+        self.assertTrue(np.all((1 <= self.model.worker_prod) & (self.model.worker_prod <= 20)))
+        self.assertTrue(np.all(np.isin(self.model.worker_d_class, [0, 1])))
+        np.testing.assert_array_equal(self.model.worker_employer, np.arange(n_workers))
+        self.assertTrue(np.all((0 <= self.model.firm_d_factor) & (self.model.firm_d_factor <= 1)))
+        self.assertFirmSizes()
+
+        for i in range(n_workers):
+            self.assertEqual(self.model.worker_wage[i], self.model.calc_wage(worker_idx=i, firm_idx=i))
+
+    def test_calc_wage(self):
+        # Test wages are MPL, less the firm's factor for workers in the firm's observed class
+        self.model.firm_d_factor[:2] = [0.25, 0.5]
+        self.model.firm_d_class[:2] = [1, 0]
+        self.model.worker_prod[:2] = [10, 20]
+        self.model.worker_d_class[:2] = [1, 1]
+
+        wages = self.model.calc_wage(worker_idx=np.array([[0], [1]]), firm_idx=np.array([[0, 1]]))
+
+        np.testing.assert_allclose(wages, [[10 * 0.75, 10], [20 * 0.75, 20]])
+
+    def test_sample_firms(self):
+        # Test each worker gets distinct firms other than their employer
+        employer_idx = np.array([0, 5, self.model.n_firms - 1])
+        idx = self.model.sample_firms(employer_idx=employer_idx, n=4)
+
+        self.assertEqual(idx.shape, (3, 4))
+        for row, employer in zip(idx, employer_idx):
+            self.assertEqual(len(set(row)), 4)
+            self.assertNotIn(employer, row)
+            self.assertTrue(all(0 <= i < self.model.n_firms for i in row))
+
+    def test_sample_all_firms(self):
+        # Test sampling every firm but the employer returns each of them once
+        employer_idx = np.array([0, 5, self.model.n_firms - 1])
+        n = self.model.n_firms - 1
+        idx = self.model.sample_firms(employer_idx=employer_idx, n=n)
+
+        self.assertEqual(idx.shape, (3, n))
+        for row, employer in zip(idx, employer_idx):
+            self.assertEqual(set(row), set(range(self.model.n_firms)) - {employer})
+
+        with self.assertRaises(ValueError):
+            self.model.sample_firms(employer_idx=employer_idx, n=n + 1)
+
+    def test_large_sample(self):
+        # Test a run with a sample close to the number of firms completes
+        self.model.p['sample'] = self.model.n_firms - 1
+        while self.model.running:
+            self.model.sim_step()
+
+        self.assertFirmSizes()
+
+    def test_best_offers_kernel(self):
+        # Test the kernel finds each worker's highest offer, first on ties
+        idx = np.arange(self.model.n_workers)
+        firm_idx = self.model.sample_firms(employer_idx=self.model.worker_employer, n=self.model.p['sample'])
+        firm_idx[0] = [0, 0, 1]
+        wages = self.model.calc_wage(worker_idx=idx[:, None], firm_idx=firm_idx)
+
+        best_firm, best_wage = best_offers_kernel(
+            self.model.worker_prod, self.model.worker_d_class, firm_idx,
+            self.model.firm_price, self.model.firm_d_factor, self.model.firm_d_class
+        )
+
+        np.testing.assert_array_equal(best_firm, firm_idx[idx, wages.argmax(axis=1)])
+        np.testing.assert_array_equal(best_wage, wages.max(axis=1))
+
+    def test_concurrent_runs(self):
+        # Test runs in separate threads match a run on its own, as in main's thread backend
+        expected = Market(self.model.p).run(display=False)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(Market(self.model.p).run, display=False) for _ in range(2)]
+            results = [future.result(timeout=60) for future in futures]
+
+        for result in results:
+            for obj_type in ['Worker', 'Firm']:
+                assert_frame_equal(result['variables'][obj_type], expected['variables'][obj_type])
+
+    def test_calc_avg_d(self):
+        # Test the averages only include firms with employees
+        active = self.model.firm_size > 0
+        d_factor = self.model.firm_d_factor[active].astype(float)
+        size = self.model.firm_size[active]
+
+        self.model.calc_avg_d()
+
+        expected_unweighted = sum(d_factor) / len(d_factor)
+        expected_weighted = sum(d_factor * size) / sum(size)
+        self.assertAlmostEqual(self.model.avg_d_unweighted, expected_unweighted)
+        self.assertAlmostEqual(self.model.avg_d_weighted, expected_weighted)
+
+    def test_education_decision(self):
+        # Test workers above mean productivity get an education and a matching wage
+        self.model.calc_avg_d()
+        avg_prod = (self.model.p['prod_range'][0] + self.model.p['prod_range'][1]) / 2
+        prod = self.model.worker_prod.copy()
+        idx = np.arange(self.model.n_workers)
+
+        self.model.education_decision(idx=idx, premium=0.2, weighted=False)
+
+        class_0 = self.model.worker_d_class == 0
+        educ = self.model.worker_educ
+        np.testing.assert_array_equal(educ[class_0], prod[class_0] > avg_prod)
+        np.testing.assert_allclose(self.model.worker_prod, np.where(educ, prod * 1.2, prod))
+        np.testing.assert_allclose(
+            self.model.worker_wage,
+            self.model.calc_wage(worker_idx=idx, firm_idx=self.model.worker_employer)
+        )
+
+    def test_firm_selection(self):
+        # Test switches raise wages and keep firm sizes consistent
+        idx = np.arange(self.model.n_workers)
+        employer = self.model.worker_employer.copy()
+        wage = self.model.worker_wage.copy()
+
+        self.model.firm_selection(idx=idx, n=self.model.p['sample'])
+
+        switch = self.model.worker_employer != employer
+        self.assertTrue(np.all(self.model.worker_wage[switch] > wage[switch]))
+        np.testing.assert_array_equal(self.model.worker_wage[~switch], wage[~switch])
+        np.testing.assert_allclose(
+            self.model.worker_wage,
+            self.model.calc_wage(worker_idx=idx, firm_idx=self.model.worker_employer)
+        )
+        self.assertFirmSizes()
+        self.assertTrue(np.all(self.model.worker_search))
+        np.testing.assert_array_equal(self.model.worker_switch, switch)
+
+    def test_produce(self):
+        # Test firm output, costs, and profit sum over each firm's employees
+        self.model.firm_selection(idx=np.arange(self.model.n_workers), n=self.model.p['sample'])
+        self.model.produce()
+        self.model.calc_profit()
+
+        for firm in range(self.model.n_firms):
+            employees = self.model.worker_employer == firm
+            class_1 = employees & (self.model.worker_d_class == 1)
+            prod = self.model.worker_prod.astype(float)
+            wage = self.model.worker_wage.astype(float)
+            output = sum(prod[employees] * self.model.worker_hrs[employees])
+            output_1 = sum(prod[class_1] * self.model.worker_hrs[class_1])
+            costs = sum(wage[employees] * self.model.worker_hrs[employees])
+
+            self.assertAlmostEqual(self.model.firm_output[firm], output)
+            self.assertAlmostEqual(self.model.firm_output_1[firm], output_1)
+            self.assertAlmostEqual(self.model.firm_output_0[firm], output - output_1)
+            self.assertAlmostEqual(self.model.firm_costs[firm], costs)
+            self.assertAlmostEqual(self.model.firm_profit[firm], output * self.model.firm_price[firm] - costs)
+
+    def test_end(self):
+        # Test the recorded microdata has one row per agent and time step
+        while self.model.running:
+            self.model.sim_step()
+        self.model.end()
+
+        workers = self.model.output['variables']['Worker']
+        firms = self.model.output['variables']['Firm']
+        steps = self.model.t + 1
+
+        self.assertEqual(len(workers), self.model.n_workers * steps)
+        self.assertEqual(len(firms), self.model.n_firms * steps)
+
+        worker = 0
+        firm = self.model.worker_employer[worker]
+        self.assertEqual(workers.loc[(worker, self.model.t), 'wage'], self.model.worker_wage[worker])
+        self.assertEqual(workers.loc[(worker, self.model.t), 'employer_id'], firm)
+        self.assertEqual(workers.loc[(worker, self.model.t), 'employer_size'], self.model.firm_size[firm])
+        self.assertEqual(firms.loc[(firm, self.model.t), 'size'], self.model.firm_size[firm])
+        self.assertEqual(firms.loc[(firm, self.model.t), 'profit'], self.model.firm_profit[firm])
+
+    def test_run_steps(self):
+        # Test the microdata covers the steps passed to run, with or without the steps parameter
+        for name, parameters in [
+            ('override', self.model.p),
+            ('no steps', {k: v for k, v in self.model.p.items() if k != 'steps'})
+        ]:
+            with self.subTest(name=name):
+                model = Market(parameters)
+                results = model.run(steps=80, display=False)
+
+                self.assertEqual(model.t, 80)
+                self.assertEqual(len(results['variables']['Worker']), model.n_workers * 81)
+                self.assertEqual(len(results['variables']['Firm']), model.n_firms * 81)
+
+    def test_save(self):
+        # Test the saved microdata reads back into the same data frames
+        while self.model.running:
+            self.model.sim_step()
+        self.model.end()
+
+        with TemporaryDirectory() as path:
+            self.model.save(exp_name='test', path=path)
+            data = load_microdata(f'{path}/test.npz')
+
+        self.assertEqual(data['parameters'], dict(self.model.p))
+        for obj_type in ['Worker', 'Firm']:
+            assert_frame_equal(data['variables'][obj_type], self.model.output['variables'][obj_type])
+
+    def test_stream(self):
+        # Test the streamed microdata matches the microdata kept in memory
+        while self.model.running:
+            self.model.sim_step()
+        self.model.end()
+
+        streamed = Market(self.model.p)
+        with TemporaryDirectory() as path:
+            streamed.stream(exp_name='test', path=path, chunk_steps=2)
+            streamed.run(display=False)
+            data = load_microdata(f'{path}/test.npz')
+
+        self.assertEqual(data['parameters'], dict(self.model.p))
+        for obj_type in ['Worker', 'Firm']:
+            assert_frame_equal(data['variables'][obj_type], self.model.output['variables'][obj_type])
@@ -1,34 +1,53 @@
 import unittest
-from unittest.mock import MagicMock
-from numpy import mean
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from src.models.firm import Firm
+from src.models.market import Market
 from src.models.worker import Worker
 
+# Model parameters shared by the tests
+PREMIUM, PROD_RANGE = 0.1, (10, 20)
+
 class TestWorker(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # Mock the model and its parameters once, shared by all tests
+        cls.mock_model = MagicMock()
+        cls.mock_model.p = {'prod_range': PROD_RANGE, 'premium': PREMIUM, 'weighted': False}
+        cls.mock_model.random.choice.return_value = 1
+        cls.mock_model.random.randint.return_value = 15
+
     def setUp(self):
-        # Mock the model and its parameters
-        self.mock_model = MagicMock()
-        self.mock_model.p = {'prod_range': (10, 20), 'premium': 0.1, 'weighted': False}
-        self.mock_model.random.choice.return_value = 1
-        self.mock_model.random.randint.return_value = 15
+        # Clear calls recorded by earlier tests, keeping the return values
+        self.mock_model.reset_mock()
 
         # Instantiate a Worker with the mocked model
         self.worker = Worker(self.mock_model)
         self.worker.setup()
 
     def test_initialization(self):
-        # Test initial values are set correctly
-        self.assertIn(self.worker.d_class, [0, 1])
-        self.assertTrue(10 <= self.worker.prod <= 20)
-        self.assertEqual(self.worker.hrs, 8)
-        self.assertFalse(self.worker.educ)
-        self.assertEqual(self.worker.wage, 0)
+        # Test initial values are set correctly, reporting each one separately
+        with self.subTest(name='d_class'):
+            self.assertIn(self.worker.d_class, [0, 1])
+        with self.subTest(name='prod'):
+            self.assertTrue(PROD_RANGE[0] <= self.worker.prod <= PROD_RANGE[1])
+        with self.subTest(name='hrs'):
+            self.assertEqual(self.worker.hrs, 8)
+        with self.subTest(name='educ'):
+            self.assertFalse(self.worker.educ)
+        with self.subTest(name='wage'):
+            self.assertEqual(self.worker.wage, 0)
+        with self.subTest(name='employer'):
+            self.assertIsNone(self.worker.employer)
+        with self.subTest(name='search'):
+            self.assertFalse(self.worker.search)
+        with self.subTest(name='switch'):
+            self.assertFalse(self.worker.switch)
 
     def test_update_employer(self):
-        # Mock a Firm object and update the employer of the worker
-        mock_firm = MagicMock()
-        mock_firm.id = 1
-        mock_firm.size = 10
+        # Stub a Firm object and update the employer of the worker
+        mock_firm = SimpleNamespace(id=1, size=10)
         self.worker.update_employer(mock_firm)
 
         # Test if the employer has been updated correctly
@@ -36,14 +55,24 @@ class TestWorker(unittest.TestCase):
         self.assertEqual(self.worker.employer_id, mock_firm.id)
         self.assertEqual(self.worker.employer_size, mock_firm.size)
 
+    def test_employer_size(self):
+        # Test the employer size follows the employer and is None when unemployed
+        self.assertIsNone(self.worker.employer_size)
+
+        mock_firm = SimpleNamespace(id=1, size=10)
+        self.worker.update_employer(mock_firm)
+        mock_firm.size = 11
+
+        self.assertEqual(self.worker.employer_size, 11)
+
     def test_get_education(self):
         # Test the effect of getting an education
         initial_prod = self.worker.prod
-        self.worker.get_education(self.mock_model.p['premium'])
+        self.worker.get_education(PREMIUM)
 
         # Check if productivity and education flag are updated correctly
         self.assertTrue(self.worker.educ)
-        self.assertEqual(self.worker.prod, initial_prod * (1 + self.mock_model.p['premium']))
+        self.assertEqual(self.worker.prod, initial_prod * (1 + PREMIUM))
 
     def test_switch_employer(self):
         # Mock the current and new employer firms
@@ -60,33 +89,23 @@ class TestWorker(unittest.TestCase):
         self.assertTrue(current_employer.separate.called)  # Assert the old employer's separate method was called
 
     def test_calc_avg_d(self):
-        # Mock firms and their discrimination factors
-        mock_firm_1 = MagicMock()
-        mock_firm_1.d_factor = 0.1
-        mock_firm_1.size = 10
-        mock_firm_2 = MagicMock()
-        mock_firm_2.d_factor = 0.2
-        mock_firm_2.size = 20
-
-        self.mock_model.firms.select.return_value = [mock_firm_1, mock_firm_2]
-
-        # Test unweighted average discrimination factor
-        avg_d_unweighted = self.worker.calc_avg_d(weighted=False)
-        expected_unweighted = mean([mock_firm_1.d_factor, mock_firm_2.d_factor])
-        self.assertEqual(avg_d_unweighted, expected_unweighted)
-
-        # Test weighted average discrimination factor
-        avg_d_weighted = self.worker.calc_avg_d(weighted=True)
-        total_size = mock_firm_1.size + mock_firm_2.size
-        expected_weighted = (mock_firm_1.d_factor * mock_firm_1.size + mock_firm_2.d_factor * mock_firm_2.size) / total_size
-        self.assertEqual(avg_d_weighted, expected_weighted)
+        # The market calculates the averages once per step, patched onto the
+        # shared mock model for this test only
+        with patch.object(self.mock_model, 'avg_d_unweighted', 0.15), \
+             patch.object(self.mock_model, 'avg_d_weighted', 0.25):
+
+            # Test unweighted average discrimination factor
+            self.assertEqual(self.worker.calc_avg_d(weighted=False), 0.15)
+
+            # Test weighted average discrimination factor
+            self.assertEqual(self.worker.calc_avg_d(weighted=True), 0.25)
 
     def test_education_decision(self):
         # Mock the calculation of average discrimination for a weighted scenario
-        self.worker.calc_avg_d = MagicMock(return_value=0.15)
+        self.worker.calc_avg_d = lambda weighted=False: 0.15
         self.worker.prod = 18  # Higher than avg_prod to ensure decision leads to getting education
 
-        self.worker.education_decision(premium=self.mock_model.p['premium'], weighted=True)
+        self.worker.education_decision(premium=PREMIUM, weighted=True)
 
         # Assert the worker decided to get an education
         self.assertTrue(self.worker.educ)
@@ -94,20 +113,38 @@ class TestWorker(unittest.TestCase):
 
     def test_firm_selection(self):
         # This test requires simulating the firm selection process
-        # Mock firms and their wage offers
-        mock_firm = MagicMock()
-        mock_firm.calc_wage.return_value = 20  # Simulate a higher wage offer
-        self.worker.select_firms = MagicMock(return_value=[mock_firm])  # Mock the selection of firms
-        self.worker.rank_firms = MagicMock(return_value=(mock_firm, 20))  # Mock the ranking of firms
+        # Stub firms and their wage offers
+        mock_firm = SimpleNamespace(id=1, calc_wage=lambda worker: 20, hire=lambda worker: None)  # Simulate a higher wage offer
+        self.worker.select_firms = lambda firms, n: [mock_firm]  # Stub the selection of firms
+        self.worker.rank_firms = lambda firms, n: (mock_firm, 20)  # Stub the ranking of firms
 
         initial_wage = 15
         self.worker.wage = initial_wage
-        self.worker.firm_selection(n=1)  # Simulate the firm selection process
+        self.worker.firm_selection(firms=[mock_firm], n=1)  # Simulate the firm selection process
 
         # Assert the worker decided to switch due to a higher wage offer
         self.assertTrue(self.worker.search)
         self.assertTrue(self.worker.switch)
         self.assertEqual(self.worker.wage, 20)  # Wage should be updated to the higher offer
 
-if __name__ == '__main__':
-    unittest.main()
+    def test_firm_selection_with_firms(self):
+        # Test the agent-level rules run with real firm agents in a market
+        model = Market({
+            'seed': 1, 'steps': 1, 'n_workers': 1, 'prod_range': PROD_RANGE, 'd_range': [0, 0.5],
+            'premium': PREMIUM, 'weighted': False, 'd_class': 1, 'active': 1, 'sample': 1
+        })
+        model.sim_setup()
+        firms = [Firm(model) for _ in range(4)]
+        worker = Worker(model)
+        worker.switch_employer(firms[0])
+        worker.wage = 0
+
+        firm, wage = worker.rank_firms(firms=firms, n=3)
+        self.assertIsNot(firm, firms[0])
+        self.assertEqual(wage, max(f.calc_wage(worker=worker) for f in firms[1:]))
+
+        worker.firm_selection(firms=firms, n=3)
+        self.assertTrue(worker.switch)
+        self.assertIsNot(worker.employer, firms[0])
+        self.assertEqual(firms[0].size, 0)
+        self.assertEqual(worker.employer.size, 1)
@@ -0,0 +1,45 @@
+import unittest
+from os import listdir
+from tempfile import TemporaryDirectory
+import numpy as np
+from src.models.writer import AsyncArtifactWriter
+
+class TestAsyncArtifactWriter(unittest.TestCase):
+
+    def test_merge(self):
+        # Test the chunks merge into one row per step, alongside the static arrays
+        with TemporaryDirectory() as path:
+            writer = AsyncArtifactWriter(f'{path}/test.npz', chunk_steps=2, static={'id': np.arange(3)})
+            for t in range(5):
+                writer.enqueue(t, {'x': np.full(3, t), 'y': np.arange(3) * t})
+            writer.close()
+
+            self.assertEqual(listdir(path), ['test.npz'])
+            with np.load(f'{path}/test.npz') as npz:
+                np.testing.assert_array_equal(npz['id'], np.arange(3))
+                np.testing.assert_array_equal(npz['x'], np.repeat(np.arange(5)[:, None], 3, axis=1))
+                np.testing.assert_array_equal(npz['y'], np.outer(np.arange(5), np.arange(3)))
+
+    def test_enqueue_copies(self):
+        # Test later changes to an enqueued array are not written
+        with TemporaryDirectory() as path:
+            writer = AsyncArtifactWriter(f'{path}/test.npz', chunk_steps=10)
+            x = np.zeros(3)
+            writer.enqueue(0, {'x': x})
+            x[:] = 1
+            writer.enqueue(1, {'x': x})
+            writer.close()
+
+            with np.load(f'{path}/test.npz') as npz:
+                np.testing.assert_array_equal(npz['x'], [[0, 0, 0], [1, 1, 1]])
+
+    def test_abort(self):
+        # Test aborting stops the writer thread and leaves no files behind
+        with TemporaryDirectory() as path:
+            writer = AsyncArtifactWriter(f'{path}/test.npz', chunk_steps=2)
+            for t in range(5):
+                writer.enqueue(t, {'x': np.full(3, t)})
+            writer.abort()
+
+            self.assertFalse(writer.thread.is_alive())
+            self.assertEqual(listdir(path), [])